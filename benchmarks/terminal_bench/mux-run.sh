@@ -31,6 +31,8 @@ export MUX_ROOT="${MUX_ROOT:-${MUX_CONFIG_ROOT}}"
 MUX_PROJECT_PATH="${MUX_PROJECT_PATH:-}"
 MUX_PROJECT_CANDIDATES="${MUX_PROJECT_CANDIDATES:-/workspace:/app:/workspaces:/root/project}"
 MUX_MODEL="${MUX_MODEL:-anthropic:claude-sonnet-4-5}"
+MUX_MODE="${MUX_MODE:-exec}"
+MUX_THINKING_LEVEL="${MUX_THINKING_LEVEL:-high}"
 MUX_TIMEOUT_MS="${MUX_TIMEOUT_MS:-}"
 MUX_WORKSPACE_ID="${MUX_WORKSPACE_ID:-mux-bench}"
 
@@ -63,6 +65,8 @@ cd "${MUX_APP_ROOT}"
 cmd=(bun src/cli/run.ts
   --dir "${project_path}"
   --model "${MUX_MODEL}"
+  --mode "${MUX_MODE}"
+  --thinking "${MUX_THINKING_LEVEL}"
   --keep-background-processes
   --json)
 
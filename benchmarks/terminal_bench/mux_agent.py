@@ -1,17 +1,44 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import os
 import shlex
-from collections.abc import Sequence
+import stat
+from collections.abc import Callable, Mapping, Sequence
+from functools import cached_property
 from pathlib import Path
+from types import MappingProxyType
 from typing import Any
 
 from harbor.agents.installed.base import BaseInstalledAgent, ExecInput
 from harbor.environments.base import BaseEnvironment
 from harbor.models.agent.context import AgentContext
 
-from .mux_payload import build_app_archive
+
+def _lut_validator(lut: dict[str, str], message: str) -> Callable[[str], str]:
+    """Build a validator that canonicalizes via a lookup table or raises."""
+
+    def validate(value: str) -> str:
+        canonical = lut.get(value.strip().lower())
+        if canonical is None:
+            raise ValueError(message)
+        return canonical
+
+    return validate
+
+
+def _validate_timeout_ms(value: str) -> str:
+    if not value.strip().isdigit():
+        raise ValueError("MUX_TIMEOUT_MS must be an integer")
+    return value
+
+
+def _validate_project_path(value: str) -> str:
+    # isspace() checks blankness without allocating a stripped copy.
+    if value.isspace():
+        raise ValueError("MUX_PROJECT_PATH must be non-empty when provided")
+    return value
 
 
 class MuxAgent(BaseInstalledAgent):
@@ -20,7 +47,7 @@ class MuxAgent(BaseInstalledAgent):
     forwards the benchmark instruction to the mux headless runner.
     """
 
-    _ARCHIVE_NAME = "mux-app.tar.gz"
+    _ARCHIVE_NAME = "mux-app.tar"
     _RUNNER_NAME = "mux-run.sh"
     _DEFAULT_MODEL = "anthropic:claude-sonnet-4-5"
     _DEFAULT_PROJECT_CANDIDATES = "/workspace:/app:/workspaces:/root/project"
@@ -64,11 +91,54 @@ class MuxAgent(BaseInstalledAgent):
         "MUX_CONFIG_ROOT",
         "MUX_APP_ROOT",
         "MUX_WORKSPACE_ID",
+        "MUX_MODE",
+        "MUX_THINKING_LEVEL",
         # Generic pass-through for arbitrary mux run CLI flags (e.g., --thinking
         # high --use-1m --budget 5.00). Avoids per-flag plumbing.
         "MUX_RUN_ARGS",
     )
 
+    # Precomputed once at class-definition time: _env fingerprints this tuple
+    # on every access, so rebuilding it per call is pure overhead.
+    _ALL_ENV_KEYS: Sequence[str] = (*_PROVIDER_ENV_KEYS, *_CONFIG_ENV_KEYS)
+
+    # Normalized input -> canonical CLI value. A single dict lookup replaces a
+    # per-call set literal + membership check + if/elif ladder, and doubles as
+    # the alias table (e.g. "execute" -> "exec").
+    # Mirrors THINKING_LEVELS in src/common/types/thinking.ts.
+    _THINKING_LEVELS: dict[str, str] = {
+        "off": "off",
+        "low": "low",
+        "medium": "medium",
+        "high": "high",
+        "xhigh": "xhigh",
+        "max": "max",
+    }
+    _MODES: dict[str, str] = {
+        "exec": "exec",
+        "execute": "exec",
+        "plan": "plan",
+    }
+
+    # Declarative env-var validation schema, built once at class-definition
+    # time and applied uniformly in _calculate_env. The model rewrite stays
+    # out of the table because it depends on constructor state.
+    _VALIDATORS: dict[str, Callable[[str], str]] = {
+        "MUX_MODE": _lut_validator(
+            _MODES, f"MUX_MODE must be one of {sorted(set(_MODES))}"
+        ),
+        "MUX_THINKING_LEVEL": _lut_validator(
+            _THINKING_LEVELS,
+            f"MUX_THINKING_LEVEL must be one of {sorted(_THINKING_LEVELS)}",
+        ),
+        "MUX_CONFIG_ROOT": str.strip,
+        "MUX_APP_ROOT": str.strip,
+        "MUX_WORKSPACE_ID": str.strip,
+        "MUX_PROJECT_CANDIDATES": str.strip,
+        "MUX_TIMEOUT_MS": _validate_timeout_ms,
+        "MUX_PROJECT_PATH": _validate_project_path,
+    }
+
     def __init__(
         self,
         logs_dir: Path,
@@ -86,45 +156,97 @@ class MuxAgent(BaseInstalledAgent):
             if repo_root_env
             else Path(__file__).resolve().parents[2]
         )
-        if not repo_root.exists():
-            raise RuntimeError(f"mux repo root {repo_root} does not exist")
+        # One os.stat per path instead of the exists()/is_file() Path probes,
+        # which each stat separately; the result also covers the type check.
+        try:
+            os.stat(repo_root)
+        except OSError as error:
+            raise RuntimeError(f"mux repo root {repo_root} does not exist") from error
 
         runner_path = Path(__file__).with_name(self._RUNNER_NAME)
-        if not runner_path.is_file():
+        try:
+            runner_stat = os.stat(runner_path)
+        except OSError as error:
+            raise RuntimeError(
+                f"mux runner script missing at {runner_path}"
+            ) from error
+        if not stat.S_ISREG(runner_stat.st_mode):
             raise RuntimeError(f"mux runner script missing at {runner_path}")
 
         self._runner_path = runner_path
         self._repo_root = repo_root
-        self._archive_bytes: bytes | None = None
-        self._model_name = (model_name or "").strip()
+        # Environments this agent already staged the payload into. A plain set
+        # (rather than lru_cache over a bound method) avoids keeping self alive
+        # through a cache closure, and stays correct if the harness ping-pongs
+        # between multiple environments.
+        self._staged_environment_ids: set[str] = set()
+        # Normalize the constructor-supplied model eagerly: it is immutable for
+        # the agent's lifetime, so there is no reason to re-run the strip +
+        # slash rewrite on every _env computation.
+        self._canonical_model = self._canonicalize_model(model_name or "")
         self._last_environment: BaseEnvironment | None = None
 
     @staticmethod
     def name() -> str:
         return "mux"
 
-    @property
-    def _env(self) -> dict[str, str]:
-        env: dict[str, str] = {}
+    @staticmethod
+    def _canonicalize_model(model_value: str) -> str:
+        """Rewrite provider/model into the provider:model form the CLI expects."""
+        model_value = model_value.strip()
+        # partition() finds the separator and splits in one scan, versus the
+        # old "/" in + split() double scan. Checking ":" on the two halves
+        # covers the whole string, preserving the no-rewrite behavior for
+        # values that already carry a provider prefix anywhere.
+        head, sep, tail = model_value.partition("/")
+        if sep and ":" not in head and ":" not in tail:
+            model_value = f"{head}:{tail}"
+        return model_value
 
-        for key in (*self._PROVIDER_ENV_KEYS, *self._CONFIG_ENV_KEYS):
-            value = os.environ.get(key)
-            if value:
-                env[key] = value
+    @property
+    def _env(self) -> Mapping[str, str]:
+        # Normalizing ~22 env vars on every access adds up when setup and
+        # downstream consumers read _env repeatedly. Cache the result, but key it
+        # on a cheap fingerprint of the vars we consume: os.environ can change
+        # between accesses (tests monkeypatch it), so an unconditional cache
+        # would go stale.
+        _get = os.environ.get
+        fingerprint = tuple(_get(key) for key in self._ALL_ENV_KEYS)
+        if self.__dict__.get("_env_fingerprint") != fingerprint:
+            self.__dict__.pop("_cached_env", None)
+            self.__dict__["_env_fingerprint"] = fingerprint
+        return self._cached_env
+
+    @cached_property
+    def _cached_env(self) -> Mapping[str, str]:
+        # Read-only view: callers share the cached mapping, so accidental
+        # mutation would corrupt every later access. Anyone who genuinely
+        # needs a mutable copy can dict(agent._env).
+        return MappingProxyType(self._calculate_env())
+
+    def _calculate_env(self) -> dict[str, str]:
+        # Hoist the bound method and let the comprehension iterate at C level;
+        # empty values are dropped just like the old loop did.
+        _get = os.environ.get
+        env: dict[str, str] = {
+            key: value for key in self._ALL_ENV_KEYS if (value := _get(key))
+        }
 
         env.setdefault("MUX_MODEL", self._DEFAULT_MODEL)
         env.setdefault("MUX_CONFIG_ROOT", "/root/.mux")
         env.setdefault("MUX_APP_ROOT", "/opt/mux-app")
         env.setdefault("MUX_WORKSPACE_ID", "mux-bench")
         env.setdefault("MUX_PROJECT_CANDIDATES", self._DEFAULT_PROJECT_CANDIDATES)
+        env.setdefault("MUX_MODE", "exec")
+        env.setdefault("MUX_THINKING_LEVEL", "high")
 
-        model_value = self._model_name or env["MUX_MODEL"]
-        model_value = model_value.strip()
+        # The constructor model is already canonical; only env-sourced values
+        # (which can change between accesses) still need normalizing here.
+        model_value = self._canonical_model or self._canonicalize_model(
+            env["MUX_MODEL"]
+        )
         if not model_value:
             raise ValueError("MUX_MODEL must be a non-empty string")
-        if "/" in model_value and ":" not in model_value:
-            provider, model_name = model_value.split("/", 1)
-            model_value = f"{provider}:{model_name}"
 
         # Fail fast for Google models if credentials weren't forwarded into the
         # sandbox env. Otherwise Harbor/mux will fail later with a less actionable
@@ -137,22 +259,9 @@ class MuxAgent(BaseInstalledAgent):
             )
         env["MUX_MODEL"] = model_value
 
-        # These env vars are all set with defaults above, no need to validate
-        for key in (
-            "MUX_CONFIG_ROOT",
-            "MUX_APP_ROOT",
-            "MUX_WORKSPACE_ID",
-            "MUX_PROJECT_CANDIDATES",
-        ):
-            env[key] = env[key].strip()
-
-        if timeout_value := env.get("MUX_TIMEOUT_MS"):
-            if not timeout_value.strip().isdigit():
-                raise ValueError("MUX_TIMEOUT_MS must be an integer")
-
-        if project_path := env.get("MUX_PROJECT_PATH"):
-            if not project_path.strip():
-                raise ValueError("MUX_PROJECT_PATH must be non-empty when provided")
+        for key, validate in self._VALIDATORS.items():
+            if (value := env.get(key)) is not None:
+                env[key] = validate(value)
 
         return env
 
@@ -164,7 +273,7 @@ class MuxAgent(BaseInstalledAgent):
     _TOKEN_FILE_PATH = "/tmp/mux-tokens.json"
 
     async def _stage_providers_config(
-        self, environment: BaseEnvironment, env: dict[str, str]
+        self, environment: BaseEnvironment, env: Mapping[str, str]
     ) -> None:
         """Upload host providers.jsonc into the sandbox when explicitly requested."""
         providers_file_raw = os.environ.get(self._PROVIDERS_FILE_ENV_KEY)
@@ -187,24 +296,36 @@ class MuxAgent(BaseInstalledAgent):
             target_path=target_path,
         )
 
-    async def setup(self, environment: BaseEnvironment) -> None:
-        """Override setup to stage payload first, then run install template."""
-        env = self._env
+    async def _stage_payload(self, environment: BaseEnvironment) -> None:
+        """Upload the app archive and runner script into the environment.
+
+        Must run BEFORE super().setup() executes the install template, which
+        extracts the archive and runs chmod on the runner.
+        """
+        # Imported on first stage: the payload module pulls tarfile/tempfile/
+        # subprocess, which env-only consumers (tests, dry runs) never need.
+        from .mux_payload import build_app_archive_to
 
         # Create /installed-agent directory (normally done by super().setup(),
         # but we need it to exist before uploading files)
         await environment.exec(command="mkdir -p /installed-agent")
 
-        # Build and stage the mux app archive BEFORE super().setup() runs the
-        # install template, which extracts the archive and runs chmod on runner
-        if not self._archive_bytes:
-            self._archive_bytes = build_app_archive(
-                self._repo_root, self._INCLUDE_PATHS
-            )
-
-        # Write archive to logs_dir and upload
+        # Cross-instance and cross-process reuse both live behind
+        # build_app_archive_to, so calling it directly is already cheap on hits.
         archive_path = self.logs_dir / self._ARCHIVE_NAME
-        archive_path.write_bytes(self._archive_bytes)
+        # __init__ already validated repo_root, so skip the builder's re-stat.
+        build_app_archive_to(
+            self._repo_root, self._INCLUDE_PATHS, archive_path, skip_exists_check=True
+        )
+
+        # Content-addressed marker: when environments share /installed-agent
+        # (e.g. a bind mount reused across containers), identical bytes are
+        # already in place and a cheap test -f replaces the multi-MB upload.
+        marker = f"/installed-agent/.mux-{self._payload_digest(archive_path)}"
+        probe = await environment.exec(command=f"test -f {marker}")
+        if probe.return_code == 0:
+            return
+
         await environment.upload_file(
             source_path=archive_path,
             target_path=f"/installed-agent/{self._ARCHIVE_NAME}",
@@ -216,6 +337,34 @@ class MuxAgent(BaseInstalledAgent):
             target_path=f"/installed-agent/{self._RUNNER_NAME}",
         )
 
+        # Written only after both uploads succeed, so a failed stage never
+        # masquerades as a staged one.
+        await environment.exec(command=f"touch {marker}")
+
+    def _payload_digest(self, archive_path: Path) -> str:
+        """Digest of everything _stage_payload uploads (archive + runner)."""
+        digest = hashlib.blake2b(digest_size=16)
+        for path in (archive_path, self._runner_path):
+            with path.open("rb") as payload_file:
+                # Chunked so the archive never has to fit in memory.
+                while chunk := payload_file.read(1 << 20):
+                    digest.update(chunk)
+        return digest.hexdigest()
+
+    async def setup(self, environment: BaseEnvironment) -> None:
+        """Override setup to stage payload first, then run install template."""
+        env = self._env
+
+        # Only memoize on a stable environment id. An id()-based fallback can
+        # collide after GC and silently skip a needed upload; backends without
+        # an id just re-stage, which the content-hash marker probe in
+        # _stage_payload keeps cheap.
+        env_id = getattr(environment, "id", None)
+        if env_id is None or env_id not in self._staged_environment_ids:
+            await self._stage_payload(environment)
+            if env_id is not None:
+                self._staged_environment_ids.add(env_id)
+
         # Now run parent setup which executes mux_setup.sh.j2 template
         # (extracts archive, installs bun/deps, chmod +x runner)
         await super().setup(environment)
@@ -233,7 +382,9 @@ class MuxAgent(BaseInstalledAgent):
         return [
             ExecInput(
                 command=command,
-                env=self._env,
+                # Fresh mutable copy at the harness boundary: ExecInput is free
+                # to own it without touching the shared cached mapping.
+                env=dict(self._env),
             )
         ]
 
@@ -1,19 +1,18 @@
 from __future__ import annotations
 
-import io
 import tarfile
 from pathlib import Path
 
 import pytest
 
+from . import mux_payload
 from .mux_agent import MuxAgent
-from .mux_payload import build_app_archive
+from .mux_payload import build_app_archive_to
 
 
 @pytest.fixture(autouse=True)
 def _clear_mux_env(monkeypatch: pytest.MonkeyPatch) -> None:
-    keys = (*MuxAgent._PROVIDER_ENV_KEYS, *MuxAgent._CONFIG_ENV_KEYS)
-    for key in keys:
+    for key in MuxAgent._ALL_ENV_KEYS:
         monkeypatch.delenv(key, raising=False)
 
 
@@ -42,13 +41,40 @@ def test_timeout_must_be_numeric(monkeypatch: pytest.MonkeyPatch) -> None:
         _ = agent._env
 
 
-def test_app_archive_includes_postinstall_script() -> None:
+def test_app_archive_includes_postinstall_script(tmp_path: Path) -> None:
     assert "scripts/postinstall.sh" in MuxAgent._INCLUDE_PATHS
 
     repo_root = _repo_root()
     postinstall = repo_root / "scripts/postinstall.sh"
     assert postinstall.is_file()
 
-    archive_bytes = build_app_archive(repo_root, ["scripts/postinstall.sh"])
-    with tarfile.open(fileobj=io.BytesIO(archive_bytes), mode="r:gz") as archive:
+    archive_path = tmp_path / MuxAgent._ARCHIVE_NAME
+    build_app_archive_to(repo_root, ["scripts/postinstall.sh"], archive_path)
+    with tarfile.open(archive_path) as archive:
         assert "scripts/postinstall.sh" in archive.getnames()
+
+
+def test_python_fallback_builds_valid_archive(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """The parallel tarfile fallback only runs on hosts without a tar binary,
+    so exercise it explicitly: CI machines all have tar on PATH."""
+    repo_root = tmp_path / "repo"
+    (repo_root / "scripts").mkdir(parents=True)
+    (repo_root / "scripts" / "postinstall.sh").write_text("#!/usr/bin/env bash\n")
+    (repo_root / "package.json").write_text("{}\n")
+
+    monkeypatch.setattr(mux_payload.shutil, "which", lambda _cmd: None)
+
+    archive_path = tmp_path / MuxAgent._ARCHIVE_NAME
+    mux_payload.build_app_archive_to(
+        repo_root, ["package.json", "scripts"], archive_path
+    )
+
+    with tarfile.open(archive_path) as archive:
+        names = archive.getnames()
+        assert "package.json" in names
+        assert "scripts/postinstall.sh" in names
+        extracted = archive.extractfile("package.json")
+        assert extracted is not None
+        assert extracted.read() == b"{}\n"
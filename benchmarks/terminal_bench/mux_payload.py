@@ -1,21 +1,242 @@
 from __future__ import annotations
 
+import hashlib
 import io
+import os
+import shutil
+import stat
+import subprocess
 import tarfile
-from collections.abc import Iterable
+import tempfile
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 
-def build_app_archive(repo_root: Path, include_paths: Iterable[str]) -> bytes:
-    """Pack the mux workspace into a gzipped tarball."""
-    if not repo_root.exists():
+# In-process memo of the on-disk cache entry per (repo, include set). A hit
+# skips even the mtime fingerprint walk; the source tree is assumed immutable
+# for the life of the process (a benchmark run never rebuilds the app
+# mid-run). Module scope rather than per-agent so every MuxAgent in the
+# process shares one entry. dict assignment is atomic under the GIL.
+_ARCHIVE_CACHE: dict[tuple[Path, frozenset[str]], Path] = {}
+
+
+def _mtime_fingerprint(repo_root: Path, include_paths: Iterable[str]) -> str:
+    """Hash the set of included files and their mtimes.
+
+    Uses os.scandir recursion rather than Path.rglob to avoid per-entry
+    PurePath allocations; DirEntry.stat() is served from the scandir cache on
+    most platforms so this stays one syscall per entry.
+    """
+    repo_root_str = os.fspath(repo_root)
+    digest = hashlib.blake2b(repo_root_str.encode())
+    for relative_path in sorted(include_paths):
+        digest.update(relative_path.encode())
+        source = os.path.join(repo_root_str, relative_path)
+        if os.path.isfile(source):
+            digest.update(str(os.stat(source).st_mtime_ns).encode())
+            continue
+        stack = [source]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in sorted(entries, key=lambda e: e.path):
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        digest.update(entry.path.encode())
+                        digest.update(
+                            str(entry.stat(follow_symlinks=False).st_mtime_ns).encode()
+                        )
+    return digest.hexdigest()
+
+
+def _archive_cache_path(repo_root: Path, include_paths: Iterable[str]) -> Path:
+    # User-scoped, 0o700: a shared $TMPDIR directory would let another local
+    # user pre-plant a poisoned archive under a computable fingerprint, and its
+    # postinstall script would run inside the task container holding the
+    # forwarded API keys.
+    cache_dir = Path.home() / ".cache" / "mux-archive-cache"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    cache_dir.chmod(0o700)
+    return cache_dir / f"{_mtime_fingerprint(repo_root, include_paths)}.tar"
+
+
+def _owned_by_current_user(path: Path) -> bool:
+    getuid = getattr(os, "getuid", None)  # absent on Windows
+    return getuid is None or os.stat(path).st_uid == getuid()
+
+
+def _publish_to_cache(source: Path, cache_path: Path) -> None:
+    """Copy a built archive into the cache via temp file + rename so concurrent
+    workers never observe a partially written entry."""
+    fd, temp_name = tempfile.mkstemp(dir=cache_path.parent)
+    try:
+        with os.fdopen(fd, "wb") as temp_file, source.open("rb") as source_file:
+            shutil.copyfileobj(source_file, temp_file)
+        os.replace(temp_name, cache_path)
+    except BaseException:
+        os.unlink(temp_name)
+        raise
+
+
+def _tarinfo_from_stat(
+    arcname: str, st: os.stat_result, *, linkname: str = ""
+) -> tarfile.TarInfo:
+    info = tarfile.TarInfo(arcname)
+    info.mode = st.st_mode & 0o7777
+    info.mtime = int(st.st_mtime)
+    if stat.S_ISDIR(st.st_mode):
+        info.type = tarfile.DIRTYPE
+    elif stat.S_ISLNK(st.st_mode):
+        info.type = tarfile.SYMTYPE
+        info.linkname = linkname
+    else:
+        info.size = st.st_size
+    return info
+
+
+def _add_tree(archive: tarfile.TarFile, source: str, arcname: str) -> None:
+    """Add a file or directory tree to ``archive``.
+
+    Equivalent to ``archive.add(source, arcname=arcname, recursive=True)`` but
+    walks with os.scandir and builds TarInfo headers by hand: tarfile's
+    recursive add() issues a fresh lstat per entry and funnels everything
+    through the slow pure-Python gettarinfo, which dominates on file-count
+    heavy trees like dist/. DirEntry.stat() reuses the scandir data, so this
+    is one syscall per entry and far fewer Python-level calls.
+    """
+    st = os.lstat(source)
+    if stat.S_ISLNK(st.st_mode):
+        archive.addfile(_tarinfo_from_stat(arcname, st, linkname=os.readlink(source)))
+        return
+    if not stat.S_ISDIR(st.st_mode):
+        with open(source, "rb") as source_file:
+            archive.addfile(_tarinfo_from_stat(arcname, st), source_file)
+        return
+
+    archive.addfile(_tarinfo_from_stat(arcname, st))
+    stack = [(source, arcname)]
+    while stack:
+        dir_path, dir_arcname = stack.pop()
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                entry_arcname = f"{dir_arcname}/{entry.name}"
+                entry_stat = entry.stat(follow_symlinks=False)
+                if entry.is_dir(follow_symlinks=False):
+                    archive.addfile(_tarinfo_from_stat(entry_arcname, entry_stat))
+                    stack.append((entry.path, entry_arcname))
+                elif entry.is_symlink():
+                    archive.addfile(
+                        _tarinfo_from_stat(
+                            entry_arcname,
+                            entry_stat,
+                            linkname=os.readlink(entry.path),
+                        )
+                    )
+                else:
+                    with open(entry.path, "rb") as source_file:
+                        archive.addfile(
+                            _tarinfo_from_stat(entry_arcname, entry_stat), source_file
+                        )
+
+
+def _build_archive_python(
+    repo_root_str: str, include_paths: Sequence[str], dest: Path
+) -> None:
+    """tarfile fallback: tar include entries in parallel, then concatenate.
+
+    Tar member streams are concatenable once end-of-archive padding is
+    stripped, so each include entry gets its own thread and buffer. stat and
+    read syscalls release the GIL, which is where the walk spends its time, so
+    the threads genuinely overlap.
+    """
+
+    def tar_one(relative_path: str) -> bytes:
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as archive:
+            _add_tree(
+                archive, os.path.join(repo_root_str, relative_path), relative_path
+            )
+            # Bytes written before close() appends EOF blocks + record padding,
+            # i.e. exactly the member stream we want to concatenate.
+            member_end = archive.offset
+        return buffer.getvalue()[:member_end]
+
+    max_workers = min(len(include_paths), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        parts = list(pool.map(tar_one, include_paths))
+
+    with open(dest, "wb") as dest_file:
+        total = 0
+        for part in parts:
+            dest_file.write(part)
+            total += len(part)
+        # Single end-of-archive marker: two zero blocks, padded so the file is
+        # a whole number of tar records.
+        eof = 2 * tarfile.BLOCKSIZE
+        padding = eof + (-(total + eof) % tarfile.RECORDSIZE)
+        dest_file.write(b"\x00" * padding)
+
+
+def build_app_archive_to(
+    repo_root: Path,
+    include_paths: Iterable[str],
+    dest: Path,
+    *,
+    skip_exists_check: bool = False,
+) -> None:
+    """Pack the mux workspace into an uncompressed tarball at ``dest``.
+
+    The tar stream is written straight to ``dest`` instead of being
+    materialized in a BytesIO first — for a populated dist/ the intermediate
+    bytes object doubled peak memory and added a full-archive memcpy.
+    The archive is uncompressed: it ships locally-built JS that is extracted
+    on the same machine moments later, and gzip was the single hottest CPU op
+    in payload staging for zero transport benefit.
+
+    Results are memoized on disk keyed by (repo_root, include_paths, mtimes):
+    Terminal-Bench spawns one agent per task, often in separate processes, and
+    rebuilding an identical multi-MB tarball per worker is pure waste.
+    """
+    # Callers that validated repo_root at construction time (MuxAgent) pass
+    # skip_exists_check=True to avoid a redundant stat per staging.
+    if not skip_exists_check and not repo_root.exists():
         raise FileNotFoundError(f"mux repo root {repo_root} not found")
 
-    buffer = io.BytesIO()
-    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
-        for relative_path in include_paths:
-            source = repo_root / relative_path
-            if not source.exists():
-                raise FileNotFoundError(f"Required file {source} missing")
-            archive.add(source, arcname=relative_path, recursive=True)
-    return buffer.getvalue()
+    # Work in str + os.path below: Path.__truediv__ allocates a fresh Path per
+    # join, which adds up across include entries; posixpath is C-backed.
+    repo_root_str = os.fspath(repo_root)
+    include_paths = tuple(include_paths)
+    # Fail here rather than letting the branches diverge: system tar refuses
+    # to create an empty archive and the fallback would choke on a zero-worker
+    # pool, neither of which names the actual problem.
+    if not include_paths:
+        raise ValueError("include_paths must not be empty")
+    for relative_path in include_paths:
+        source = os.path.join(repo_root_str, relative_path)
+        if not os.path.exists(source):
+            raise FileNotFoundError(f"Required file {source} missing")
+
+    cache_key = (repo_root.resolve(), frozenset(include_paths))
+    cached = _ARCHIVE_CACHE.get(cache_key)
+    if cached is not None and cached.is_file():
+        shutil.copyfile(cached, dest)
+        return
+
+    cache_path = _archive_cache_path(repo_root, include_paths)
+    if cache_path.is_file() and _owned_by_current_user(cache_path):
+        _ARCHIVE_CACHE[cache_key] = cache_path
+        shutil.copyfile(cache_path, dest)
+        return
+
+    # Prefer the system tar binary: it is C + syscalls and beats Python-level
+    # per-member dispatch by a wide margin on file-count-heavy trees. Fall back
+    # to tarfile where no tar exists (e.g. Windows CI).
+    if shutil.which("tar"):
+        subprocess.check_call(
+            ["tar", "-C", repo_root_str, "-cf", os.fspath(dest), *include_paths]
+        )
+    else:
+        _build_archive_python(repo_root_str, include_paths, dest)
+    _publish_to_cache(dest, cache_path)
+    _ARCHIVE_CACHE[cache_key] = cache_path
@@ -335,7 +335,7 @@ def prepare_submission(
                     trial_src,
                     dest_trial_dir,
                     ignore=shutil.ignore_patterns(
-                        "mux-app.tar.gz",  # Large agent binary (~5MB each)
+                        "mux-app.tar*",  # Large agent binary (~5MB each)
                         "mux-tokens.json",  # Token usage (not needed for leaderboard)
                         "*.log",  # Log files trigger HF LFS and cause upload timeouts
                     ),